@@ -315,7 +315,7 @@ class CompileUpload(WindowLayout):
         if fm.is_valid_dir(self.backup_path.get()):
             local_repo_dir = pd[self.product]["repo_name"].split("/")[1]
             install_dir = fm.get_install_dir(local_repo_dir)
-            check_list = fm.get_config_files(self.backup_path.get(), pd[self.product]["minimum_config_files"])
+            check_list = fm.get_config_files(self.backup_path.get(), pd[self.product]["minimum_config_re"])
             if hasattr(pd[self.product], "other_config_files"):
                 extra_check_list = fm.get_config_files(install_dir, pd[self.product]["other_config_files"])
                 if extra_check_list:
@@ -329,7 +329,7 @@ class CompileUpload(WindowLayout):
                 self.overwrite_button.grid()
                 self.log.debug(message)
             else:
-                copy_list = fm.get_config_files(install_dir, pd[self.product]["minimum_config_files"])
+                copy_list = fm.get_config_files(install_dir, pd[self.product]["minimum_config_re"])
                 if copy_list:
                     if "other_config_files" in pd[self.product]:
                         extra_list = fm.get_config_files(install_dir, pd[self.product]["other_config_files"])
@@ -765,7 +765,7 @@ class EXCommandStation(WindowLayout):
         file_list = []
         local_repo_dir = pd[self.product]["repo_name"].split("/")[1]
         product_dir = fm.get_install_dir(local_repo_dir)
-        min_list = fm.get_config_files(product_dir, pd[self.product]["minimum_config_files"])
+        min_list = fm.get_config_files(product_dir, pd[self.product]["minimum_config_re"])
         if min_list:
             file_list += min_list
         other_list = None
@@ -25,22 +25,174 @@ along with CommandStation.  If not, see <https://www.gnu.org/licenses/>.
 
 import platform
 import os
+import errno
+import stat
 import sys
-import tempfile
-import requests
 import tarfile
 from zipfile import ZipFile, Path
 from threading import Thread, Lock
 from collections import namedtuple
 import re
-import shutil
 import logging
 import json
+from functools import lru_cache
 
 
 QueueMessage = namedtuple("QueueMessage", ["status", "topic", "data"])
 
 
+@lru_cache(maxsize=256)
+def _compile(pattern):
+    """
+    Compile and cache a regular expression pattern
+
+    Config file patterns are fixed per product, so each is compiled once and reused for every file checked
+    """
+    return re.compile(pattern)
+
+
+@lru_cache(maxsize=1)
+def _base_dir():
+    """
+    Resolve the EX-Installer base directory in the user's home directory
+    """
+    if not platform.system():
+        FileManager.log.error("Unsupported operating system")
+        raise ValueError("Unsupported operating system")
+    home_dir = os.path.expanduser("~")
+    if not home_dir:
+        FileManager.log.error("Could not obtain user home directory")
+        raise ValueError("Could not obtain user home directory")
+    _cli_path = os.path.join(home_dir, "ex-installer")
+    FileManager.log.debug(_cli_path)
+    return _cli_path
+
+
+@lru_cache(maxsize=1)
+def _temp_dir():
+    """
+    Resolve the system temp directory
+    """
+    if not platform.system():
+        FileManager.log.error("Unsupported operating system")
+        raise ValueError("Unsupported operating system")
+    import tempfile
+
+    temp_dir = tempfile.gettempdir()
+    if not temp_dir:
+        FileManager.log.error("Unable to determine temp directory")
+        raise ValueError("Unable to determine temp directory")
+    FileManager.log.debug(temp_dir)
+    return temp_dir
+
+
+@lru_cache(maxsize=1)
+def _renameat2():
+    """
+    Look up Linux renameat2(), which refuses to replace an existing target as part of the rename itself
+
+    Returns a rename(source, target) function raising OSError on failure, or None where it is unavailable
+    """
+    if not sys.platform.startswith("linux"):
+        return None
+    import ctypes
+
+    try:
+        renameat2 = ctypes.CDLL(None, use_errno=True).renameat2
+    except (OSError, AttributeError):
+        return None
+    renameat2.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_int, ctypes.c_char_p, ctypes.c_uint]
+    renameat2.restype = ctypes.c_int
+    at_fdcwd = -100
+    rename_noreplace = 1
+
+    def rename(source, target):
+        if renameat2(at_fdcwd, os.fsencode(source), at_fdcwd, os.fsencode(target), rename_noreplace) != 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error), source, None, target)
+
+    return rename
+
+
+def _rename_noreplace(source, target):
+    """
+    Rename source to target, raising FileExistsError rather than replacing an existing target
+
+    Windows os.rename() already refuses an existing target, and Linux renameat2() does so in the same syscall, but
+    POSIX rename() silently replaces an empty directory, so elsewhere the target is checked first
+    """
+    if os.name == "nt":
+        os.rename(source, target)
+        return
+    renameat2 = _renameat2()
+    if renameat2 is not None:
+        try:
+            renameat2(source, target)
+            return
+        except OSError as error:
+            # Older kernels and some filesystems do not support the flag
+            if error.errno not in (errno.EINVAL, errno.ENOSYS):
+                raise
+    if os.path.lexists(target):
+        raise FileExistsError(errno.EEXIST, os.strerror(errno.EEXIST), target)
+    os.rename(source, target)
+
+
+_SEPARATORS = tuple(sep for sep in (os.sep, os.altsep) if sep)
+
+
+def _dir_prefix(dir):
+    """
+    Return dir with a trailing separator, so per-file paths can be built by concatenation
+
+    Equivalent to os.path.join(dir, name) for the plain file names in the config file lists, without re-parsing
+    dir for every file
+    """
+    if not dir or dir.endswith(_SEPARATORS):
+        return dir
+    return dir + os.sep
+
+
+def _copy_file(source, dest):
+    """
+    Copy a single file and its permission bits, as shutil.copy does
+
+    Where available (Linux), os.copy_file_range() has the kernel copy the data, or reflink it on filesystems that
+    support it, without passing through user space; otherwise, or if the kernel refuses, shutil.copy is used
+    """
+    import shutil
+
+    if hasattr(os, "copy_file_range"):
+        try:
+            with open(source, "rb") as source_file:
+                source_stat = os.fstat(source_file.fileno())
+                # Opening dest for writing truncates it, which would empty the source if both are the same file
+                try:
+                    dest_stat = os.stat(dest)
+                except FileNotFoundError:
+                    pass
+                else:
+                    if os.path.samestat(source_stat, dest_stat):
+                        raise shutil.SameFileError(f"{source!r} and {dest!r} are the same file")
+                with open(dest, "wb") as dest_file:
+                    remaining = source_stat.st_size
+                    while remaining > 0:
+                        copied = os.copy_file_range(source_file.fileno(), dest_file.fileno(), remaining)
+                        if copied == 0:
+                            break
+                        remaining -= copied
+                    if remaining == 0:
+                        # As shutil.copymode() would, but from the fstat above rather than another stat by path
+                        os.fchmod(dest_file.fileno(), stat.S_IMODE(source_stat.st_mode))
+                        return
+        except shutil.SameFileError:
+            raise
+        except OSError:
+            pass
+        # Refused by the kernel, or stopped short as some procfs, sysfs and FUSE files do, so copy the usual way
+    shutil.copy(source, dest)
+
+
 class ThreadedDownloader(Thread):
 
     download_lock = Lock()
@@ -60,6 +212,9 @@ class ThreadedDownloader(Thread):
             QueueMessage("info", f"Downloading {self.url}", f"Downloading {self.url}")
         )
         self.log.debug(self.url)
+        # Imported on first download rather than at startup, requests pulls in urllib3 and friends
+        import requests
+
         with self.download_lock:
             _response = requests.get(self.url, stream=True)
             if _response.status_code == 200:
@@ -107,9 +262,11 @@ class ThreadedExtractor(Thread):
                 relpath = None
                 try:
                     with ZipFile(self.archive_file) as archive:
-                        for item in Path(archive).iterdir():
+                        # Build the zip Path and list the top level once, rather than again for every directory found
+                        top_level = list(Path(archive).iterdir())
+                        for item in top_level:
                             if item.is_dir():
-                                relpath, = Path(archive).iterdir()
+                                relpath, = top_level
                         archive.extractall(self.target_dir)
                     if relpath:
                         dir_name = os.path.join(self.target_dir.replace("\\\\", "\\"), relpath.name)
@@ -163,31 +320,19 @@ class FileManager:
     def get_base_dir():
         """
         Returns the base directory for EX-Installer
+
+        Resolved once and cached, as neither the platform nor the user's home directory change while running
         """
-        if not platform.system():
-            raise ValueError("Unsupported operating system")
-            FileManager.log.error("Unsupported operating system")
-            return False
-        else:
-            if os.path.expanduser("~"):
-                _cli_path = os.path.join(
-                    os.path.expanduser("~"),
-                    "ex-installer",
-                )
-                FileManager.log.debug(_cli_path)
-                return _cli_path
-            else:
-                raise ValueError("Could not obtain user home directory")
-                FileManager.log.error("Could not obtain user home directory")
-                return False
+        return _base_dir()
 
     @staticmethod
     def get_install_dir(product_name):
         """
         Returns the path to extract software into
         """
-        if FileManager.get_base_dir():
-            dir = os.path.join(FileManager.get_base_dir(), product_name)
+        base_dir = _base_dir()
+        if base_dir:
+            dir = os.path.join(base_dir, product_name)
             FileManager.log.debug(dir)
             return dir
         else:
@@ -198,35 +343,28 @@ class FileManager:
     def get_temp_dir():
         """
         Returns the temp directory
+
+        Resolved once and cached, tempfile.gettempdir() probes candidate directories on first use
         """
-        if not platform.system():
-            raise ValueError("Unsupported operating system")
-            FileManager.log.error("Unsupported operating system")
-            return False
-        else:
-            if tempfile.gettempdir():
-                FileManager.log.debug(tempfile.gettempdir())
-                return tempfile.gettempdir()
-            else:
-                raise ValueError("Unable to determine temp directory")
-                FileManager.log.error("Unable to determine temp directory")
-                return False
+        return _temp_dir()
 
     @staticmethod
     def rename_dir(source_dir, target_dir):
-        if os.path.exists(source_dir):
-            if not os.path.exists(target_dir):
-                try:
-                    os.rename(source_dir, target_dir)
-                except Exception as error:
-                    FileManager.log.error(str(error))
-                    return False
-                else:
-                    return True
-            else:
-                return False
-        else:
+        """
+        Rename source_dir to target_dir, provided source_dir exists and target_dir does not
+
+        Returns True if renamed, otherwise False
+        """
+        # The rename itself reports a missing source or existing target, so neither is stat'ed up front
+        try:
+            _rename_noreplace(source_dir, target_dir)
+        except (FileNotFoundError, FileExistsError):
+            return False
+        except OSError as error:
+            FileManager.log.error(str(error))
             return False
+        else:
+            return True
 
     @staticmethod
     def read_version(version_file):
@@ -258,21 +396,66 @@ class FileManager:
         This is a valid example of a pattern: r"^my.*\.[^?]*example\.h$|(^my.*\.h$)"  # noqa: W605
         This is an invalid example of a pattern: r"^config\.h$"  # noqa: W605
         This would be valid, but better to just provide filename: r"^(config\.h)$"  # noqa: W605
+
+        Alternatively a precompiled pattern can be provided instead of the list, in which case the names of all files
+        it fully matches are returned, e.g. the "minimum_config_re" entries in product_details
+
+        Directory entries are read in a single os.scandir() pass, and only regular files are considered
+        A pattern without a group can only ever match a file by name, so those are checked with a set lookup and the
+        rest are fused into one alternation, rejecting most files with a single regex search
         """
-        if os.path.exists(dir):
+        # Patterns are prepared before the directory is opened, so an invalid one cannot leak the scandir handle
+        if isinstance(pattern_list, re.Pattern):
+            fullmatch = pattern_list.fullmatch
+            try:
+                entries = os.scandir(dir)
+            except OSError:
+                return False
             config_files = []
-            for file in os.listdir(dir):
-                for pattern in pattern_list:
-                    file_match = re.search(pattern, file)
+            with entries:
+                for entry in entries:
+                    if entry.is_file() and fullmatch(entry.name):
+                        config_files.append(entry.name)
+            return config_files
+        # A pattern with no "(" has no group 1, so the only match it can make is on the exact file name
+        compiled_list = [(pattern, _compile(pattern) if "(" in pattern else None) for pattern in pattern_list]
+        literals = frozenset(pattern for pattern, compiled in compiled_list if compiled is None)
+        regex_patterns = [pattern for pattern, compiled in compiled_list if compiled is not None]
+        combined = None
+        if regex_patterns:
+            try:
+                combined = _compile("|".join(f"(?:{pattern})" for pattern in regex_patterns))
+            except re.error:
+                # Valid on their own but not once fused, e.g. a global flag such as (?i) that must lead the pattern,
+                # so every file becomes a candidate for the per-pattern checks
+                combined = _compile("")
+        try:
+            entries = os.scandir(dir)
+        except OSError:
+            return False
+        config_files = []
+        with entries:
+            for entry in entries:
+                # DirEntry caches the file type from the directory read, so no extra stat is needed
+                if not entry.is_file():
+                    continue
+                file = entry.name
+                # Only candidates go through the per-pattern checks, which decide the group 1 semantics
+                if file not in literals and (combined is None or not combined.search(file)):
+                    continue
+                for pattern, compiled in compiled_list:
+                    if compiled is None:
+                        if file == pattern:
+                            config_files.append(file)
+                        continue
+                    file_match = compiled.search(file)
                     if file_match and len(file_match.groups()) > 0:
                         filename = file_match[1]
                         if filename:
                             config_files.append(filename)
                     elif file == pattern:
                         config_files.append(file)
-            return config_files
-        else:
-            return False
+        return config_files
 
     @staticmethod
     def get_filepath(dir, filename):
@@ -280,18 +463,20 @@ class FileManager:
 
     @staticmethod
     def get_list_from_file(file_path, pattern):
-        match_list = []
-        if os.path.exists(file_path):
+        compiled = _compile(pattern)
+        # Opening directly replaces a separate exists() check; the with block closes the file when done
+        try:
             file = open(file_path, "r", encoding="utf-8")
+        except OSError:
+            return False
+        # A dict keeps first-seen order and deduplicates in O(1) per match, instead of a list scan per match
+        matches = {}
+        with file:
             for line in file:
-                match = re.search(pattern, line)
+                match = compiled.search(line)
                 if match:
-                    option = match[1]
-                    if option not in match_list:
-                        match_list.append(option)
-            return match_list
-        else:
-            return False
+                    matches[match[1]] = None
+        return list(matches)
 
     @staticmethod
     def write_config_file(file_path, contents):
@@ -303,10 +488,10 @@ class FileManager:
         Returns the same file path if successful, otherwise the exception error message
         """
         try:
-            file = open(file_path, "w", encoding="utf-8")
-            for line in contents:
-                file.write(line)
-            file.close()
+            # Join first so the whole file goes out in one write rather than one per line
+            data = "".join(contents)
+            with open(file_path, "w", encoding="utf-8") as file:
+                file.write(data)
             return file_path
         except Exception as error:
             return str(error)
@@ -318,10 +503,9 @@ class FileManager:
         Returns the text from the file path if successful, otherwise the exception error message
         """
         try:
-            file = open(file_path, "r", encoding="utf-8")
-            lines = file.read()
-            file.close()
-            return lines
+            # A single read() sizes its buffer from the open file's fstat, so the contents arrive in one read
+            with open(file_path, "r", encoding="utf-8") as file:
+                return file.read()
         except Exception as error:
             return str(error)
 
@@ -343,15 +527,30 @@ class FileManager:
         Copy the specified list of files from source to destination directory
 
         Returns None if successful, otherwise a list of files that failed to copy
+
+        Copies are I/O bound and release the GIL, so several files are copied concurrently by a small thread pool
         """
-        failed_files = []
-        for file in file_list:
-            source = os.path.join(source_dir, file)
-            dest = os.path.join(dest_dir, file)
+        source_prefix = _dir_prefix(source_dir)
+        dest_prefix = _dir_prefix(dest_dir)
+
+        def copy(file):
+            # A missing source is reported by the copy's own open, so it is not stat'ed beforehand
             try:
-                shutil.copy(source, dest)
-            except Exception:
-                failed_files.append(file)
+                _copy_file(source_prefix + file, dest_prefix + file)
+            except OSError:
+                return False
+            return True
+
+        file_list = list(file_list)
+        if len(file_list) <= 1:
+            # Not worth starting a thread for a single file
+            copied = [copy(file) for file in file_list]
+        else:
+            from concurrent.futures import ThreadPoolExecutor
+
+            with ThreadPoolExecutor(max_workers=min(4, len(file_list))) as executor:
+                copied = list(executor.map(copy, file_list))
+        failed_files = [file for file, success in zip(file_list, copied) if not success]
         if len(failed_files) > 0:
             return failed_files
         else:
@@ -365,11 +564,13 @@ class FileManager:
         Returns None if successful, otherwise a list of files that failed to copy
         """
         failed_files = []
+        prefix = _dir_prefix(dir)
         for file_name in file_list:
-            file = os.path.join(dir, file_name)
+            file = prefix + file_name
+            # Just try the unlink, a missing file is reported by the OSError rather than a prior exists() stat
             try:
-                os.remove(file)
-            except Exception:
+                os.unlink(file)
+            except OSError:
                 failed_files.append(file_name)
         if len(failed_files) > 0:
             return failed_files
@@ -383,10 +584,10 @@ class FileManager:
 
         Returns True or False
         """
-        if os.path.exists(dir) and os.path.isdir(dir):
-            return True
-        else:
+        # os.path.isdir() is a single stat that is False for missing paths, no separate exists() check needed
+        if not dir:
             return False
+        return os.path.isdir(dir)
 
     @staticmethod
     def save_user_preferences(preferences):
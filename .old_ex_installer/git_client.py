@@ -29,6 +29,7 @@ from threading import Thread, Lock
 from collections import namedtuple, OrderedDict
 import os
 import re
+import time
 import logging
 
 QueueMessage = namedtuple("QueueMessage", ["status", "topic", "data"])
@@ -42,14 +43,35 @@ gitignore_files = [
     ".DS_Store"
 ]
 
+"""
+Pattern for GitHub version tags (vX.Y.Z-Prod|Devel), compiled once as it is applied to every tag in a repo
+"""
+_VERSION_RE = re.compile(r"v(\d+)\.(\d+)\.(\d+)-(Prod|Devel)")
+
+"""
+Recent dir_is_git_repo() results as {absolute path: (time.monotonic() checked, result)}
+
+A result is reused for _STAT_CACHE_TTL seconds rather than stat'ed again. The only caller, setup_local_repo() in
+select_version_config, runs once per user action, so this only saves the stat when that action is repeated quickly
+
+clone_repo() drops the entry for its target, as that is about to change
+"""
+_STAT_CACHE = {}
+_STAT_CACHE_TTL = 1.0
+
 
 @staticmethod
 def get_exception(error):
     """
     Get an exception into text to add to the queue
+
+    The text is cached on the exception instance, so the same error reported more than once is only formatted once
     """
-    template = "An exception of type {0} occurred. Arguments:\n{1!r}"
-    message = template.format(type(error).__name__, error.args)
+    message = error.__dict__.get("_queue_message")
+    if message is None:
+        template = "An exception of type {0} occurred. Arguments:\n{1!r}"
+        message = template.format(type(error).__name__, error.args)
+        error.__dict__["_queue_message"] = message
     return message
 
 
@@ -170,14 +192,17 @@ class GitClient:
 
         Returns True if so, False if not
         """
-        git_file = os.path.join(dir, ".git")
-        if os.path.exists(dir) and os.path.isdir(dir):
-            if os.path.exists(git_file):
-                return True
-            else:
-                return False
-        else:
+        if not dir:
             return False
+        key = os.path.abspath(dir)
+        now = time.monotonic()
+        cached = _STAT_CACHE.get(key)
+        if cached is not None and now - cached[0] < _STAT_CACHE_TTL:
+            return cached[1]
+        # A missing or non-directory parent makes this False too, so the directory needs no separate check
+        result = os.path.lexists(os.path.join(key, ".git"))
+        _STAT_CACHE[key] = (now, result)
+        return result
 
     @staticmethod
     def clone_repo(repo_url, repo_dir, queue):
@@ -186,6 +211,7 @@ class GitClient:
 
         Returns the repo instance in queue data if successful
         """
+        _STAT_CACHE.pop(os.path.abspath(repo_dir), None)
         task_name = "clone_repo"
         thread = ThreadedGitClient(task_name, pygit2.clone_repository, queue, repo_url, repo_dir)
         thread.start()
@@ -256,10 +282,9 @@ class GitClient:
         """
         versions_unsorted = {}
         version_list = {}
-        version_match = r"v(\d+)\.(\d+)\.(\d+)-(Prod|Devel)"
         refs = repo.references.iterator(2)
         for ref in refs:
-            version = re.search(version_match, ref.shorthand)
+            version = _VERSION_RE.search(ref.shorthand)
             if version:
                 numbers = {"major": int(version[1]),
                            "minor": int(version[2]),
@@ -288,8 +313,7 @@ class GitClient:
         version_string must match a GitHub version style tag to work
         vX.Y.Z-Prod|Devel
         """
-        version_match = r"v(\d+)\.(\d+)\.(\d+)-(Prod|Devel)"
-        version = re.search(version_match, version_string)
+        version = _VERSION_RE.search(version_string)
         if version:
             return (int(version[1]), int(version[2]), int(version[3]))
         else:
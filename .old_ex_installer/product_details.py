@@ -21,23 +21,29 @@ You should have received a copy of the GNU General Public License
 along with CommandStation.  If not, see <https://www.gnu.org/licenses/>.
 """
 
+import re
+from types import MappingProxyType
+
 from . import images
 
-product_details = {
+"""
+Supported devices are frozensets as they are only ever checked for membership, e.g. when validating a selected board
+"""
+_product_details = {
     "ex_commandstation": {
         "product_name": "EX-CommandStation",
         "product_logo": images.EX_COMMANDSTATION_LOGO,
         "repo_name": "DCC-EX/CommandStation-EX",
         "default_branch": "master",
         "repo_url": "https://github.com/DCC-EX/CommandStation-EX.git",
-        "supported_devices": [
+        "supported_devices": frozenset({
             "arduino:avr:uno",
             "arduino:avr:nano",
             "arduino:avr:mega",
             "esp32:esp32:esp32",
             "STMicroelectronics:stm32:Nucleo_64:pnum=NUCLEO_F411RE",
             "STMicroelectronics:stm32:Nucleo_64:pnum=NUCLEO_F446RE"
-        ],
+        }),
         "minimum_config_files": [
             "config.h"
         ],
@@ -52,12 +58,12 @@ product_details = {
         "repo_name": "DCC-EX/EX-IOExpander",
         "default_branch": "main",
         "repo_url": "https://github.com/DCC-EX/EX-IOExpander.git",
-        "supported_devices": [
+        "supported_devices": frozenset({
             "arduino:avr:uno",
             "arduino:avr:nano",
             "arduino:avr:mega",
             "STMicroelectronics:stm32:Nucleo_64:pnum=NUCLEO_F411RE"
-        ],
+        }),
         "minimum_config_files": [
             "myConfig.h"
         ]
@@ -68,12 +74,49 @@ product_details = {
         "repo_name": "DCC-EX/EX-Turntable",
         "default_branch": "main",
         "repo_url": "https://github.com/DCC-EX/EX-Turntable.git",
-        "supported_devices": [
+        "supported_devices": frozenset({
             "arduino:avr:uno",
             "arduino:avr:nano",
-        ],
+        }),
         "minimum_config_files": [
             "config.h"
         ]
     }
 }
+
+
+def _minimum_config_re(product, names):
+    """
+    Compile a product's minimum config file names into one pattern matching exactly those names
+
+    Only plain file names (no "(") are accepted, which get_config_files() matches by name alone in the list form too;
+    a grouped pattern would need the list form's group 1 handling, so it is refused here rather than never matching
+    """
+    for name in names:
+        if "(" in name:
+            raise ValueError(f"{product} minimum_config_files entry {name!r} must be a plain file name")
+    return re.compile("|".join(re.escape(name) for name in names))
+
+
+"""
+The registry is exposed read-only so nothing can change it after the device index below has been derived from it
+
+Each product also gets "minimum_config_re", its minimum config file names compiled once into a single pattern that
+FileManager.get_config_files() accepts in place of the list
+"""
+product_details = MappingProxyType({
+    product: MappingProxyType({
+        **details,
+        "minimum_config_re": _minimum_config_re(product, details["minimum_config_files"])
+    }) for product, details in _product_details.items()
+})
+
+"""
+Reverse index of device FQBN to the products supporting it, for a single lookup instead of scanning every product
+"""
+_device_index = {}
+for _product, _details in product_details.items():
+    for _device in _details["supported_devices"]:
+        _device_index.setdefault(_device, []).append(_product)
+_device_index = MappingProxyType({device: tuple(products) for device, products in _device_index.items()})
+del _product, _details, _device
@@ -353,7 +353,7 @@ class SelectVersionConfig(WindowLayout):
                 self.next_back.disable_next()
                 self.log.error(f"EX-Installer repository folder location chosen: {self.product_dir}")
             else:
-                config_files = fm.get_config_files(self.config_path.get(), pd[self.product]["minimum_config_files"])
+                config_files = fm.get_config_files(self.config_path.get(), pd[self.product]["minimum_config_re"])
                 if config_files:
                     self.next_back.enable_next()
                 else:
@@ -372,7 +372,7 @@ class SelectVersionConfig(WindowLayout):
         needed on subsequent passes thru the logic
         """
         file_list = []
-        min_list = fm.get_config_files(self.product_dir, pd[self.product]["minimum_config_files"])
+        min_list = fm.get_config_files(self.product_dir, pd[self.product]["minimum_config_re"])
         if min_list:
             file_list += min_list
         other_list = None
@@ -392,7 +392,7 @@ class SelectVersionConfig(WindowLayout):
         Function to copy config files from selected directory to product directory
         also switches view to advanced_config if copy is successful
         """
-        copy_list = fm.get_config_files(self.config_path.get(), pd[self.product]["minimum_config_files"])
+        copy_list = fm.get_config_files(self.config_path.get(), pd[self.product]["minimum_config_re"])
         if copy_list:
             extra_list = None
             if "other_config_files" in pd[self.product]:
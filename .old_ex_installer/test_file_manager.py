@@ -4,11 +4,15 @@ Unit tests for ex_installer/file_manager.py — FileManager static methods
 Tests path building, file read/write, directory operations, config-pattern matching,
 and list extraction from files. No GUI, no renderer.
 """
+import errno
 import json
 import os
+import platform
+import queue
 import re
 import sys
 import tempfile
+import zipfile
 from pathlib import Path
 
 import pytest
@@ -16,7 +20,7 @@ import pytest
 REPO_ROOT = Path(__file__).parent.parent
 sys.path.insert(0, str(REPO_ROOT))
 
-from ex_installer.file_manager import FileManager  # noqa: E402
+from ex_installer.file_manager import FileManager, ThreadedExtractor  # noqa: E402
 
 
 # ---------------------------------------------------------------------------
@@ -37,6 +41,11 @@ class TestGetBaseDir:
         result = FileManager.get_base_dir()
         assert result.startswith(home)
 
+    def test_result_is_cached(self, monkeypatch):
+        result = FileManager.get_base_dir()
+        monkeypatch.setattr(os.path, "expanduser", lambda path: "/elsewhere")
+        assert FileManager.get_base_dir() == result
+
 
 # ---------------------------------------------------------------------------
 # get_install_dir()
@@ -74,6 +83,11 @@ class TestGetTempDir:
         result = FileManager.get_temp_dir()
         assert result == tempfile.gettempdir()
 
+    def test_result_is_cached(self, monkeypatch):
+        result = FileManager.get_temp_dir()
+        monkeypatch.setattr(tempfile, "gettempdir", lambda: "/elsewhere")
+        assert FileManager.get_temp_dir() == result
+
 
 # ---------------------------------------------------------------------------
 # is_valid_dir()
@@ -193,10 +207,62 @@ class TestGetConfigFiles:
         result = FileManager.get_config_files(str(tmp_path), [pattern])
         assert "myAutomation.h" in result
 
+    def test_commandstation_pattern_skips_example_files(self, tmp_path):
+        # The example alternative matches without capturing, so example files are not returned
+        (tmp_path / "myAutomation.example.h").write_text("")
+        (tmp_path / "myAutomation.h").write_text("")
+        pattern = r"^my.*\.[^?]*example\.h$|(^my.*\.h$)"
+        result = FileManager.get_config_files(str(tmp_path), [pattern])
+        assert result == ["myAutomation.h"]
+
+    def test_filename_pattern_does_not_match_substring(self, tmp_path):
+        (tmp_path / "myconfig.h").write_text("")
+        result = FileManager.get_config_files(str(tmp_path), ["config.h"])
+        assert result == []
+
+    def test_filename_pattern_dot_is_not_a_wildcard(self, tmp_path):
+        (tmp_path / "configXh").write_text("")
+        (tmp_path / "config.h").write_text("")
+        result = FileManager.get_config_files(str(tmp_path), ["config.h"])
+        assert result == ["config.h"]
+
+    def test_invalid_pattern_raises_before_scanning(self, tmp_path, monkeypatch):
+        def no_scandir(path):
+            raise AssertionError("directory opened before patterns were compiled")
+
+        monkeypatch.setattr(os, "scandir", no_scandir)
+        with pytest.raises(re.error):
+            FileManager.get_config_files(str(tmp_path), [r"^(config\.h$"])
+
+    def test_patterns_that_cannot_be_fused_still_match(self, tmp_path):
+        (tmp_path / "MyConfig.h").write_text("")
+        (tmp_path / "myAutomation.h").write_text("")
+        patterns = [r"(?i)^(myconfig\.h)$", r"^(myAutomation\.h)$"]
+        result = FileManager.get_config_files(str(tmp_path), patterns)
+        assert sorted(result) == ["MyConfig.h", "myAutomation.h"]
+
+    def test_precompiled_pattern_selects_full_matches(self, tmp_path):
+        (tmp_path / "config.h").write_text("")
+        (tmp_path / "myconfig.h").write_text("")
+        (tmp_path / "configXh").write_text("")
+        result = FileManager.get_config_files(str(tmp_path), re.compile(r"config\.h"))
+        assert result == ["config.h"]
+
     def test_empty_dir_returns_empty_list(self, tmp_path):
         result = FileManager.get_config_files(str(tmp_path), ["config.h"])
         assert result == []
 
+    def test_ignores_directories_matching_pattern(self, tmp_path):
+        (tmp_path / "config.h").mkdir()
+        result = FileManager.get_config_files(str(tmp_path), ["config.h"])
+        assert result == []
+
+    def test_returns_false_for_file_path(self, tmp_path):
+        f = tmp_path / "config.h"
+        f.write_text("")
+        result = FileManager.get_config_files(str(f), ["config.h"])
+        assert result is False
+
     def test_multiple_patterns_matched(self, tmp_path):
         (tmp_path / "config.h").write_text("")
         (tmp_path / "myConfig.h").write_text("")
@@ -229,6 +295,23 @@ class TestGetListFromFile:
         result = FileManager.get_list_from_file(fp, r"(foo|bar)")
         assert result.count("foo") == 1
 
+    def test_returns_false_for_directory(self, tmp_path):
+        result = FileManager.get_list_from_file(str(tmp_path), r"(.*)")
+        assert result is False
+
+    def test_matches_are_per_line(self, tmp_path):
+        # \s must not let a match span two lines
+        fp = str(tmp_path / "MotorDrivers.h")
+        Path(fp).write_text('#define\nSTANDARD F("Standard")\n')
+        result = FileManager.get_list_from_file(fp, r'^.+?\s(.+?)\sF\(".+?"\).*$')
+        assert result == []
+
+    def test_preserves_first_seen_order(self, tmp_path):
+        fp = str(tmp_path / "data.txt")
+        Path(fp).write_text("bar\nfoo\nbar\nbaz\n")
+        result = FileManager.get_list_from_file(fp, r"(foo|bar|baz)")
+        assert result == ["bar", "foo", "baz"]
+
     def test_returns_empty_list_when_no_matches(self, tmp_path):
         fp = str(tmp_path / "data.txt")
         Path(fp).write_text("no match here\n")
@@ -263,6 +346,31 @@ class TestRenameDir:
         dst.mkdir()
         result = FileManager.rename_dir(str(src), str(dst))
         assert result is False
+        assert src.is_dir()
+
+    def test_returns_false_when_target_is_a_file(self, tmp_path):
+        src = tmp_path / "source"
+        dst = tmp_path / "target"
+        src.mkdir()
+        dst.write_text("")
+        result = FileManager.rename_dir(str(src), str(dst))
+        assert result is False
+        assert src.is_dir()
+        assert dst.is_file()
+
+    def test_falls_back_when_no_replace_is_unsupported(self, tmp_path, monkeypatch):
+        def unsupported(source, target):
+            raise OSError(errno.EINVAL, "Invalid argument")
+
+        monkeypatch.setattr("ex_installer.file_manager._renameat2", lambda: unsupported)
+        src = tmp_path / "source"
+        dst = tmp_path / "target"
+        src.mkdir()
+        dst.mkdir()
+        assert FileManager.rename_dir(str(src), str(dst)) is False
+        dst.rmdir()
+        assert FileManager.rename_dir(str(src), str(dst)) is True
+        assert dst.is_dir()
 
 
 # ---------------------------------------------------------------------------
@@ -288,6 +396,81 @@ class TestCopyAndDeleteConfigFiles:
         assert isinstance(result, list)
         assert "missing.h" in result
 
+    def test_copy_preserves_contents(self, tmp_path):
+        src_dir = tmp_path / "src"
+        dst_dir = tmp_path / "dst"
+        src_dir.mkdir()
+        dst_dir.mkdir()
+        contents = "#define MOTOR_SHIELD_TYPE STANDARD_MOTOR_SHIELD\n" * 1000
+        (src_dir / "config.h").write_text(contents)
+        FileManager.copy_config_files(str(src_dir), str(dst_dir), ["config.h"])
+        assert (dst_dir / "config.h").read_text() == contents
+
+    def test_copy_falls_back_when_kernel_copy_fails(self, tmp_path, monkeypatch):
+        def refuse(*args, **kwargs):
+            raise OSError(errno.EXDEV, "Invalid cross-device link")
+
+        monkeypatch.setattr(os, "copy_file_range", refuse, raising=False)
+        src_dir = tmp_path / "src"
+        dst_dir = tmp_path / "dst"
+        src_dir.mkdir()
+        dst_dir.mkdir()
+        (src_dir / "config.h").write_text("// config")
+        result = FileManager.copy_config_files(str(src_dir), str(dst_dir), ["config.h"])
+        assert result is None
+        assert (dst_dir / "config.h").read_text() == "// config"
+
+    def test_copy_onto_itself_fails_and_keeps_contents(self, tmp_path):
+        (tmp_path / "config.h").write_text("// config")
+        result = FileManager.copy_config_files(str(tmp_path), str(tmp_path), ["config.h"])
+        assert result == ["config.h"]
+        assert (tmp_path / "config.h").read_text() == "// config"
+
+    def test_copy_falls_back_when_kernel_copy_stops_short(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(os, "copy_file_range", lambda *args, **kwargs: 0, raising=False)
+        src_dir = tmp_path / "src"
+        dst_dir = tmp_path / "dst"
+        src_dir.mkdir()
+        dst_dir.mkdir()
+        (src_dir / "config.h").write_text("// config")
+        result = FileManager.copy_config_files(str(src_dir), str(dst_dir), ["config.h"])
+        assert result is None
+        assert (dst_dir / "config.h").read_text() == "// config"
+
+    def test_copy_accepts_trailing_separator(self, tmp_path):
+        src_dir = tmp_path / "src"
+        dst_dir = tmp_path / "dst"
+        src_dir.mkdir()
+        dst_dir.mkdir()
+        (src_dir / "config.h").write_text("// config")
+        result = FileManager.copy_config_files(str(src_dir) + os.sep, str(dst_dir) + os.sep, ["config.h"])
+        assert result is None
+        assert (dst_dir / "config.h").read_text() == "// config"
+
+    def test_copy_many_reports_failures_in_order(self, tmp_path):
+        src_dir = tmp_path / "src"
+        dst_dir = tmp_path / "dst"
+        src_dir.mkdir()
+        dst_dir.mkdir()
+        names = [f"config{i}.h" for i in range(10)]
+        for name in names[::2]:
+            (src_dir / name).write_text(name)
+        result = FileManager.copy_config_files(str(src_dir), str(dst_dir), names)
+        assert result == names[1::2]
+        for name in names[::2]:
+            assert (dst_dir / name).read_text() == name
+
+    @pytest.mark.skipif(os.name != "posix", reason="POSIX permission bits")
+    def test_copy_preserves_permissions(self, tmp_path):
+        src_dir = tmp_path / "src"
+        dst_dir = tmp_path / "dst"
+        src_dir.mkdir()
+        dst_dir.mkdir()
+        (src_dir / "config.h").write_text("// config")
+        os.chmod(src_dir / "config.h", 0o640)
+        FileManager.copy_config_files(str(src_dir), str(dst_dir), ["config.h"])
+        assert (dst_dir / "config.h").stat().st_mode & 0o777 == 0o640
+
     def test_delete_returns_none_on_success(self, tmp_path):
         (tmp_path / "config.h").write_text("")
         result = FileManager.delete_config_files(str(tmp_path), ["config.h"])
@@ -298,3 +481,40 @@ class TestCopyAndDeleteConfigFiles:
         result = FileManager.delete_config_files(str(tmp_path), ["nonexistent.h"])
         assert isinstance(result, list)
         assert "nonexistent.h" in result
+
+    def test_delete_continues_past_failures(self, tmp_path):
+        (tmp_path / "config.h").write_text("")
+        (tmp_path / "subdir").mkdir()
+        result = FileManager.delete_config_files(str(tmp_path), ["missing.h", "subdir", "config.h"])
+        assert result == ["missing.h", "subdir"]
+        assert not (tmp_path / "config.h").exists()
+
+
+# ---------------------------------------------------------------------------
+# ThreadedExtractor (zip archives)
+# ---------------------------------------------------------------------------
+
+class TestThreadedExtractorZip:
+    def _extract(self, tmp_path, monkeypatch, names):
+        monkeypatch.setattr(platform, "system", lambda: "Windows")
+        archive_file = tmp_path / "archive.zip"
+        with zipfile.ZipFile(archive_file, "w") as archive:
+            for name in names:
+                archive.writestr(name, "")
+        target = tmp_path / "target"
+        target.mkdir()
+        messages = queue.Queue()
+        ThreadedExtractor(str(archive_file), str(target), messages).run()
+        messages.get_nowait()
+        return str(target), messages.get_nowait()
+
+    def test_single_top_level_dir_is_returned(self, tmp_path, monkeypatch):
+        target, message = self._extract(tmp_path, monkeypatch, ["repo-1.0/config.h", "repo-1.0/src/main.cpp"])
+        assert message.status == "success"
+        assert message.data == os.path.join(target, "repo-1.0")
+        assert os.path.isfile(os.path.join(target, "repo-1.0", "config.h"))
+
+    def test_top_level_files_return_target_dir(self, tmp_path, monkeypatch):
+        target, message = self._extract(tmp_path, monkeypatch, ["config.h", "main.cpp"])
+        assert message.status == "success"
+        assert message.data == target
@@ -6,6 +6,7 @@ No network, no real repository cloning, no GUI.
 """
 import os
 import sys
+import time
 from pathlib import Path
 
 import pytest
@@ -13,7 +14,7 @@ import pytest
 REPO_ROOT = Path(__file__).parent.parent
 sys.path.insert(0, str(REPO_ROOT))
 
-from ex_installer.git_client import GitClient, get_exception  # noqa: E402
+from ex_installer.git_client import GitClient, get_exception, _STAT_CACHE  # noqa: E402
 
 
 # ---------------------------------------------------------------------------
@@ -38,6 +39,12 @@ class TestGetException:
         assert isinstance(result, str)
         assert len(result) > 0
 
+    def test_repeated_call_returns_same_message(self):
+        error = ValueError("oops")
+        first = get_exception(error)
+        assert get_exception(error) is first
+        assert get_exception(ValueError("oops")) == first
+
 
 # ---------------------------------------------------------------------------
 # extract_version_details()
@@ -98,6 +105,9 @@ class TestExtractVersionDetails:
 # ---------------------------------------------------------------------------
 
 class TestDirIsGitRepo:
+    def setup_method(self):
+        _STAT_CACHE.clear()
+
     def test_returns_true_for_dir_with_dot_git(self, tmp_path):
         git_file = tmp_path / ".git"
         git_file.write_text("gitdir: ...")
@@ -115,5 +125,23 @@ class TestDirIsGitRepo:
         git_dir.mkdir()
         assert GitClient.dir_is_git_repo(str(tmp_path)) is True
 
+    def test_returns_false_for_file_path(self, tmp_path):
+        f = tmp_path / "file.txt"
+        f.write_text("hello")
+        assert GitClient.dir_is_git_repo(str(f)) is False
+
     def test_returns_false_for_empty_string(self):
         assert GitClient.dir_is_git_repo("") is False
+
+    def test_result_is_reused_within_ttl(self, tmp_path):
+        assert GitClient.dir_is_git_repo(str(tmp_path)) is False
+        (tmp_path / ".git").mkdir()
+        assert GitClient.dir_is_git_repo(str(tmp_path)) is False
+        _STAT_CACHE.clear()
+        assert GitClient.dir_is_git_repo(str(tmp_path)) is True
+
+    def test_result_is_rechecked_after_ttl(self, tmp_path):
+        assert GitClient.dir_is_git_repo(str(tmp_path)) is False
+        (tmp_path / ".git").mkdir()
+        _STAT_CACHE[os.path.abspath(str(tmp_path))] = (time.monotonic() - 2.0, False)
+        assert GitClient.dir_is_git_repo(str(tmp_path)) is True
@@ -13,7 +13,7 @@ import pytest
 REPO_ROOT = Path(__file__).parent.parent
 sys.path.insert(0, str(REPO_ROOT))
 
-from ex_installer.product_details import product_details  # noqa: E402
+from ex_installer.product_details import product_details, _device_index, _minimum_config_re  # noqa: E402
 
 
 REQUIRED_PRODUCT_KEYS = {
@@ -62,9 +62,9 @@ class TestRegistryCompleteness:
         assert url.endswith(".git"), f"URL does not end with .git: {url}"
 
     @pytest.mark.parametrize("product", KNOWN_PRODUCTS)
-    def test_supported_devices_is_non_empty_list(self, product):
+    def test_supported_devices_is_non_empty_frozenset(self, product):
         devices = product_details[product]["supported_devices"]
-        assert isinstance(devices, list)
+        assert isinstance(devices, frozenset)
         assert len(devices) > 0
 
     @pytest.mark.parametrize("product", KNOWN_PRODUCTS)
@@ -73,6 +73,48 @@ class TestRegistryCompleteness:
         assert isinstance(files, list)
         assert len(files) > 0
 
+    @pytest.mark.parametrize("product", KNOWN_PRODUCTS)
+    def test_minimum_config_re_matches_only_minimum_files(self, product):
+        config_re = product_details[product]["minimum_config_re"]
+        for name in product_details[product]["minimum_config_files"]:
+            assert config_re.fullmatch(name)
+            assert not config_re.fullmatch("my" + name)
+            assert not config_re.fullmatch(name.replace(".", "X"))
+
+    def test_minimum_config_re_refuses_grouped_pattern(self):
+        with pytest.raises(ValueError):
+            _minimum_config_re("ex_test", ["config.h", r"^(myConfig\.h)$"])
+
+
+# ---------------------------------------------------------------------------
+# Immutability and device index
+# ---------------------------------------------------------------------------
+
+class TestImmutability:
+    def test_registry_is_read_only(self):
+        with pytest.raises(TypeError):
+            product_details["ex_new_product"] = {}
+
+    @pytest.mark.parametrize("product", KNOWN_PRODUCTS)
+    def test_product_entry_is_read_only(self, product):
+        with pytest.raises(TypeError):
+            product_details[product]["product_name"] = "Renamed"
+
+
+class TestDeviceIndex:
+    def test_index_matches_supported_devices(self):
+        for product, details in product_details.items():
+            for device in details["supported_devices"]:
+                assert product in _device_index[device]
+
+    def test_index_lists_only_supporting_products(self):
+        for device, products in _device_index.items():
+            for product in products:
+                assert device in product_details[product]["supported_devices"]
+
+    def test_esp32_is_commandstation_only(self):
+        assert _device_index["esp32:esp32:esp32"] == ("ex_commandstation",)
+
 
 # ---------------------------------------------------------------------------
 # EX-CommandStation specifics
@@ -4,48 +4,308 @@ detect_boards.py  –  Enumerate USB serial devices and output JSON lines.
 
 Usage
 -----
-  python3 detect_boards.py [--port PATH]
+  python3 detect_boards.py [--port PATH] [--all] [--no-cache] [--cache-ttl SECONDS]
+  python3 detect_boards.py --serve [--all] [--no-cache] [--cache-ttl SECONDS]
 
 Each detected device is printed as a single JSON object per line so that
 python-shell (mode='json') can parse it in the Electron main process.
+
+With --serve the script stays alive and performs one enumeration per line
+read from stdin, avoiding interpreter start-up and the pyserial import on
+every poll.  A request line is either a JSON frame such as
+{"port": "/dev/ttyUSB0"}, a JSON string such as "/dev/ttyUSB0" (what
+python-shell's send() writes in json mode), a bare port path, or an empty
+line for all ports.
+Each batch of records is terminated by an {"eom": true} line.  When a batch
+is byte-for-byte identical to the previous one it is replaced by a single
+{"unchanged": true} line, so the steady state costs one short line per poll.
+
+Built-in UARTs (/dev/ttyS*) and Bluetooth serial ports without a USB vendor
+ID are skipped, since no board is ever attached to them.  Pass --all to
+list them anyway; an explicit --port is always honoured.
+
+Enumeration results are cached in the system temp directory for a short
+time (2 seconds by default) so rapid successive polls skip the comports()
+scan.  Pass --no-cache to force a fresh scan.
 """
 from __future__ import annotations
 
 import json
+import os
 import sys
+import tempfile
+import time
+from typing import Callable, Iterable, Iterator
 
 try:
-    import serial.tools.list_ports as list_ports
+    import orjson
 except ImportError:
-    print(json.dumps({"error": "pyserial not installed"}))
-    sys.exit(1)
+    # Optional speed-up; the stdlib encoder is used when it is not installed
+    orjson = None
 
+# One shared stdlib encoder instead of a fresh one per json.dumps() call;
+# compact separators also match orjson's output and shave bytes per line
+_json_encode = json.JSONEncoder(separators=(",", ":")).encode
 
-def main() -> None:
-    port_filter: str | None = None
-    if "--port" in sys.argv:
-        idx = sys.argv.index("--port")
-        if idx + 1 < len(sys.argv):
-            port_filter = sys.argv[idx + 1]
-
-    ports = list(list_ports.comports())
-    if port_filter:
-        ports = [p for p in ports if p.device == port_filter]
-
-    for port in ports:
-        record = {
-            "path": port.device,
+# The temp directory is shared on multi-user POSIX hosts, so the snapshot is
+# per user, and read_cache() ignores one owned by anybody else
+CACHE_PATH = os.path.join(
+    tempfile.gettempdir(),
+    f"ex_installer_ports-{os.getuid()}.json" if hasattr(os, "getuid") else "ex_installer_ports.json",
+)
+DEFAULT_CACHE_TTL = 2.0
+
+# Device prefixes of ports that are never a USB board: built-in UARTs on
+# Linux and Bluetooth serial profiles on macOS.  Only skipped without a VID.
+PSEUDO_PORT_PREFIXES = ("/dev/ttyS", "/dev/cu.Bluetooth", "/dev/tty.Bluetooth")
+
+# Fixed protocol lines, encoded once rather than on every poll
+NO_DEVICES_LINE = b'{"info":"no devices found"}'
+PYSERIAL_ERROR_LINE = b'{"error":"pyserial not installed"}'
+EOM_LINE = b'{"eom":true}'
+UNCHANGED_LINE = b'{"unchanged":true}'
+
+# Command-line options that take a value; every other argument is a flag
+VALUE_OPTIONS = frozenset({"--port", "--cache-ttl"})
+
+
+def encode(obj: dict) -> bytes:
+    """Serialise one JSON line body, using orjson when it is available."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return _json_encode(obj).encode("utf-8")
+
+
+def emit(*lines: bytes) -> None:
+    """
+    Write complete JSON lines to stdout in a single write, then flush.
+
+    Encoded bytes go straight to the binary buffer, skipping print() and the
+    text layer's re-encode.  python-shell reads one JSON object per line.
+    """
+    out = sys.stdout.buffer
+    out.write(b"\n".join(lines) + b"\n")
+    out.flush()
+
+
+def read_cache(ttl: float, include_all: bool) -> list[dict] | None:
+    """Return cached port records if the snapshot is fresher than `ttl` seconds."""
+    try:
+        with open(CACHE_PATH, "r", encoding="utf-8") as f:
+            # fstat the file actually opened, so it cannot be swapped in between
+            st = os.fstat(f.fileno())
+            # Another local user can create this path first in the shared
+            # temp dir; their records must never be taken for ours
+            if hasattr(os, "getuid") and st.st_uid != os.getuid():
+                return None
+            # An mtime in the future would otherwise stay fresh forever
+            if not 0 <= time.time() - st.st_mtime < ttl:
+                return None
+            snapshot = json.load(f)
+    except (OSError, ValueError):
+        return None
+    # Any valid JSON may be found there, so check the shape before using it
+    if not isinstance(snapshot, dict):
+        return None
+    # Snapshots are keyed by platform so a shared temp dir never mixes backends
+    if snapshot.get("platform") != sys.platform:
+        return None
+    # A snapshot taken with --all holds pseudo-ports a default scan skips
+    if snapshot.get("all", False) != include_all:
+        return None
+    records = snapshot.get("records")
+    if not isinstance(records, list) or not all(isinstance(r, dict) and "path" in r for r in records):
+        return None
+    return records
+
+
+def write_cache(records: list[dict], include_all: bool) -> None:
+    """Atomically replace the cache snapshot with `records`."""
+    # Freshness comes from the file's own mtime, so the snapshot does not store one
+    snapshot = {"platform": sys.platform, "all": include_all, "records": records}
+    # mkstemp() creates the file exclusively, so a symlink planted in the
+    # world-writable temp dir is never followed
+    try:
+        fd, tmp_path = tempfile.mkstemp(
+            prefix=os.path.basename(CACHE_PATH) + ".", suffix=".tmp", dir=os.path.dirname(CACHE_PATH),
+        )
+    except OSError:
+        return
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(snapshot, f)
+        os.replace(tmp_path, CACHE_PATH)
+    except OSError:
+        # Caching is best effort; a failed write must never break enumeration
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
+
+def device_exists(path: str) -> bool:
+    """
+    Cheap pre-check for a --port request.
+
+    On POSIX every serial port is a device node, so a single stat rules out a
+    missing port without walking every tty.  Windows COM names are not
+    filesystem paths, so there the answer is left to enumeration.
+    """
+    return os.name != "posix" or os.path.exists(path)
+
+
+def iter_comports() -> Iterable:
+    """
+    Iterate serial ports as the platform backend discovers them.
+
+    pyserial's Windows comports() is list(iterate_comports()), so every
+    device's SetupAPI and registry queries finish before the first port is
+    returned.  Using the generator directly lets each record stream out as
+    soon as its own queries complete.
+    """
+    # pyserial is imported on first use: its import walks the platform
+    # backends, which a fresh cache hit never needs
+    if os.name == "nt":
+        from serial.tools.list_ports_windows import iterate_comports
+        return iterate_comports()
+    import serial.tools.list_ports as list_ports
+    return list_ports.comports()
+
+
+def iter_port_records(port_filter: str | None, include_all: bool) -> Iterator[dict]:
+    """Yield a JSON record for each serial port as pyserial reports it."""
+    skip_pseudo = not include_all and not port_filter
+    for port in iter_comports():
+        device = port.device
+        if port_filter and device != port_filter:
+            continue
+        # Read each attribute once; some backends expose them as properties
+        vid = port.vid
+        if skip_pseudo and vid is None and device.startswith(PSEUDO_PORT_PREFIXES):
+            continue
+        pid = port.pid
+        yield {
+            "path": device,
             "description": port.description,
             "manufacturer": port.manufacturer,
-            "vid": f"{port.vid:04X}" if port.vid is not None else None,
-            "pid": f"{port.pid:04X}" if port.pid is not None else None,
+            # %-formatting skips the format-spec parser that f"{v:04X}" uses
+            "vid": ("%04X" % vid) if vid is not None else None,
+            "pid": ("%04X" % pid) if pid is not None else None,
             "serial_number": port.serial_number,
         }
-        # python-shell reads one JSON object per stdout line
-        print(json.dumps(record), flush=True)
+        # Device paths are unique, so nothing after the requested port matters
+        if port_filter:
+            break
+
+
+def enumerate_and_emit(
+    port_filter: str | None,
+    include_all: bool,
+    use_cache: bool,
+    cache_ttl: float,
+    out: Callable[..., None] = emit,
+) -> None:
+    """Pass one JSON line per matching port, or a "no devices" line, to `out`."""
+    count = 0
+    if not port_filter or device_exists(port_filter):
+        records = read_cache(cache_ttl, include_all) if use_cache else None
+        if records is not None and port_filter:
+            # A default snapshot leaves out the pseudo-ports an explicit --port
+            # still honours, so a port missing from it is looked up afresh
+            records = [r for r in records if r["path"] == port_filter][:1] or None
+        if records is not None:
+            if records:
+                # Cached records are already complete, so emit them in one write
+                out(*[encode(r) for r in records])
+            count = len(records)
+        else:
+            # A fresh scan streams each record as soon as pyserial reports it,
+            # so Electron can show the first port before slow probes finish
+            scanned = []
+            for record in iter_port_records(port_filter, include_all):
+                out(encode(record))
+                scanned.append(record)
+            # A filtered scan is partial and must not replace the full snapshot
+            if use_cache and not port_filter:
+                write_cache(scanned, include_all)
+            count = len(scanned)
+
+    if not count:
+        out(NO_DEVICES_LINE)
+
+
+def parse_request(line: str) -> str | None:
+    """Extract the port filter from one --serve request line."""
+    line = line.strip()
+    if not line:
+        return None
+    try:
+        frame = json.loads(line)
+    except ValueError:
+        return line
+    port = frame.get("port") if isinstance(frame, dict) else frame
+    # Anything but a non-empty string (a list, a number, null) means all
+    # ports; it must never reach os.stat(), which takes an int as an fd
+    return port if isinstance(port, str) and port else None
+
+
+def serve(include_all: bool, use_cache: bool, cache_ttl: float) -> None:
+    """Answer one enumeration request per stdin line until stdin closes."""
+    previous: bytes | None = None
+    for line in sys.stdin:
+        # Collect the whole batch so it can be compared with the last one;
+        # a few hundred bytes compare faster than they would hash
+        batch: list[bytes] = []
+        enumerate_and_emit(
+            parse_request(line), include_all, use_cache, cache_ttl,
+            out=lambda *lines: batch.extend(lines),
+        )
+        joined = b"\n".join(batch)
+        if joined == previous:
+            emit(UNCHANGED_LINE, EOM_LINE)
+        else:
+            emit(*batch, EOM_LINE)
+            previous = joined
+
+
+def parse_args(argv: list[str]) -> dict[str, str | bool]:
+    """
+    Parse argv in a single pass, without importing argparse.
+
+    Options in VALUE_OPTIONS map to the following argument; anything else is
+    treated as a flag and maps to True.
+    """
+    args: dict[str, str | bool] = {}
+    it = iter(argv)
+    for key in it:
+        if key in VALUE_OPTIONS:
+            value = next(it, None)
+            if value is not None:
+                args[key] = value
+        else:
+            args[key] = True
+    return args
+
+
+def main() -> None:
+    args = parse_args(sys.argv[1:])
+    port_filter = args.get("--port")
+    include_all = "--all" in args
+
+    try:
+        cache_ttl = float(args.get("--cache-ttl", DEFAULT_CACHE_TTL))
+    except ValueError:
+        cache_ttl = DEFAULT_CACHE_TTL
+    use_cache = "--no-cache" not in args and cache_ttl > 0
 
-    if not ports:
-        print(json.dumps({"info": "no devices found"}), flush=True)
+    try:
+        if "--serve" in args:
+            serve(include_all, use_cache, cache_ttl)
+        else:
+            enumerate_and_emit(port_filter, include_all, use_cache, cache_ttl)
+    except ImportError:
+        emit(PYSERIAL_ERROR_LINE)
+        sys.exit(1)
 
 
 if __name__ == "__main__":
@@ -1,14 +1,17 @@
 """
 Unit tests for src/python/detect_boards.py
 
-Tests serial port enumeration, JSON output format, port filtering, and error handling.
+Tests serial port enumeration, JSON output format, port filtering, result caching,
+--serve mode, and error handling.
 No renderer, no Electron, no GUI — pure Python logic tested in isolation.
 """
 import builtins
 import importlib.util
 import io
 import json
+import os
 import sys
+import types
 from pathlib import Path
 from unittest.mock import MagicMock, patch
 
@@ -19,38 +22,43 @@ DETECT_BOARDS_PATH = REPO_ROOT / "src" / "python" / "detect_boards.py"
 
 
 def _make_port(device, description, manufacturer=None, vid=None, pid=None, serial_number=None):
-    """Create a mock serial port object."""
-    port = MagicMock()
-    port.device = device
-    port.description = description
-    port.manufacturer = manufacturer
-    port.vid = vid
-    port.pid = pid
-    port.serial_number = serial_number
-    return port
-
-
-def _load_module():
-    """Load detect_boards module fresh each call (avoids cached import state)."""
+    """Create a stand-in serial port object (a plain namespace is far cheaper than MagicMock)."""
+    return types.SimpleNamespace(
+        device=device,
+        description=description,
+        manufacturer=manufacturer,
+        vid=vid,
+        pid=pid,
+        serial_number=serial_number,
+    )
+
+
+@pytest.fixture(scope="session")
+def detect_boards():
+    """Load detect_boards once per session; tests patch iter_comports individually."""
     spec = importlib.util.spec_from_file_location("detect_boards", DETECT_BOARDS_PATH)
     mod = importlib.util.module_from_spec(spec)
     spec.loader.exec_module(mod)
     return mod
 
 
-def _run_main(comports_return, argv=None):
-    """Run detect_boards.main() with mocked comports(); return list of parsed JSON records."""
-    detect_boards = _load_module()
+def _read_records(capsys):
+    """Parse everything captured on stdout so far as JSON lines."""
+    lines = [ln.strip() for ln in capsys.readouterr().out.splitlines() if ln.strip()]
+    return [json.loads(line) for line in lines]
+
+
+def _run_main(detect_boards, capsys, comports_return, argv=None):
+    """Run detect_boards.main() uncached with mocked ports; return list of parsed JSON records."""
     mock_comports = MagicMock(return_value=comports_return)
+    argv = ["--no-cache"] + (argv or [])
 
-    with patch.object(detect_boards.list_ports, "comports", mock_comports):
-        with patch.object(sys, "argv", ["detect_boards.py"] + (argv or [])):
-            captured = io.StringIO()
-            with patch("sys.stdout", captured):
-                detect_boards.main()
+    with patch.object(detect_boards, "iter_comports", mock_comports), \
+            patch.object(detect_boards, "device_exists", return_value=True):
+        with patch.object(sys, "argv", ["detect_boards.py"] + argv):
+            detect_boards.main()
 
-    lines = [ln.strip() for ln in captured.getvalue().splitlines() if ln.strip()]
-    return [json.loads(line) for line in lines]
+    return _read_records(capsys)
 
 
 # ---------------------------------------------------------------------------
@@ -58,86 +66,151 @@ def _run_main(comports_return, argv=None):
 # ---------------------------------------------------------------------------
 
 class TestOutputFormat:
-    def test_single_port_outputs_one_record(self):
-        records = _run_main([_make_port("/dev/ttyUSB0", "USB Serial Device")])
+    def test_single_port_outputs_one_record(self, detect_boards, capsys):
+        records = _run_main(detect_boards, capsys, [_make_port("/dev/ttyUSB0", "USB Serial Device")])
         assert len(records) == 1
 
-    def test_multiple_ports_one_record_each(self):
+    def test_multiple_ports_one_record_each(self, detect_boards, capsys):
         ports = [
             _make_port("/dev/ttyUSB0", "USB Serial Device"),
             _make_port("/dev/ttyACM0", "Arduino Mega"),
         ]
-        assert len(_run_main(ports)) == 2
+        assert len(_run_main(detect_boards, capsys, ports)) == 2
 
-    def test_record_has_all_required_keys(self):
-        record = _run_main([_make_port("/dev/ttyUSB0", "desc")])[0]
+    def test_record_has_all_required_keys(self, detect_boards, capsys):
+        record = _run_main(detect_boards, capsys, [_make_port("/dev/ttyUSB0", "desc")])[0]
         for key in ("path", "description", "manufacturer", "vid", "pid", "serial_number"):
             assert key in record, f"Missing key: {key}"
 
-    def test_path_field_matches_device(self):
-        record = _run_main([_make_port("/dev/ttyUSB0", "desc")])[0]
+    def test_path_field_matches_device(self, detect_boards, capsys):
+        record = _run_main(detect_boards, capsys, [_make_port("/dev/ttyUSB0", "desc")])[0]
         assert record["path"] == "/dev/ttyUSB0"
 
-    def test_description_field(self):
-        record = _run_main([_make_port("/dev/ttyUSB0", "Arduino Uno")])[0]
+    def test_description_field(self, detect_boards, capsys):
+        record = _run_main(detect_boards, capsys, [_make_port("/dev/ttyUSB0", "Arduino Uno")])[0]
         assert record["description"] == "Arduino Uno"
 
-    def test_manufacturer_field(self):
-        record = _run_main([_make_port("/dev/ttyUSB0", "desc", manufacturer="Arduino LLC")])[0]
+    def test_manufacturer_field(self, detect_boards, capsys):
+        record = _run_main(detect_boards, capsys, [_make_port("/dev/ttyUSB0", "desc", manufacturer="Arduino LLC")])[0]
         assert record["manufacturer"] == "Arduino LLC"
 
-    def test_manufacturer_none_serialises_as_null(self):
-        record = _run_main([_make_port("/dev/ttyUSB0", "desc", manufacturer=None)])[0]
+    def test_manufacturer_none_serialises_as_null(self, detect_boards, capsys):
+        record = _run_main(detect_boards, capsys, [_make_port("/dev/ttyUSB0", "desc", manufacturer=None)])[0]
         assert record["manufacturer"] is None
 
-    def test_serial_number_field(self):
-        record = _run_main([_make_port("/dev/ttyUSB0", "desc", serial_number="ABC123")])[0]
+    def test_serial_number_field(self, detect_boards, capsys):
+        record = _run_main(detect_boards, capsys, [_make_port("/dev/ttyUSB0", "desc", serial_number="ABC123")])[0]
         assert record["serial_number"] == "ABC123"
 
-    def test_output_is_valid_json_on_each_line(self):
+    def test_output_is_valid_json_on_each_line(self, detect_boards, capsys):
         ports = [_make_port(f"/dev/ttyUSB{i}", f"Device {i}") for i in range(3)]
-        detect_boards = _load_module()
-        with patch.object(detect_boards.list_ports, "comports", return_value=ports):
-            with patch.object(sys, "argv", ["detect_boards.py"]):
-                captured = io.StringIO()
-                with patch("sys.stdout", captured):
-                    detect_boards.main()
-        for line in captured.getvalue().splitlines():
+        with patch.object(detect_boards, "iter_comports", return_value=ports):
+            with patch.object(sys, "argv", ["detect_boards.py", "--no-cache"]):
+                detect_boards.main()
+        for line in capsys.readouterr().out.splitlines():
             json.loads(line)  # must not raise
 
+    def test_records_stream_before_enumeration_finishes(self, detect_boards, capsys):
+        emitted_before_second_port = []
+
+        def ports():
+            yield _make_port("/dev/ttyUSB0", "Device A")
+            emitted_before_second_port.append(capsys.readouterr().out)
+            yield _make_port("/dev/ttyUSB1", "Device B")
+
+        records = _run_main(detect_boards, capsys, ports())
+        assert '"/dev/ttyUSB0"' in emitted_before_second_port[0]
+        assert records[0]["path"] == "/dev/ttyUSB1"
+
+    def test_windows_iterates_backend_generator(self, detect_boards, capsys):
+        backend = types.ModuleType("serial.tools.list_ports_windows")
+        backend.iterate_comports = lambda: iter([_make_port("COM3", "Arduino Mega")])
+        # The only test of the backend choice, so iter_comports itself is left unpatched
+        with patch.dict(sys.modules, {"serial.tools.list_ports_windows": backend}), \
+                patch.object(detect_boards.os, "name", "nt"), \
+                patch.object(detect_boards, "device_exists", return_value=True), \
+                patch.object(sys, "argv", ["detect_boards.py", "--no-cache"]):
+            detect_boards.main()
+        assert _read_records(capsys)[0]["path"] == "COM3"
+
+    def test_stdlib_json_used_without_orjson(self, detect_boards, capsys):
+        with patch.object(detect_boards, "orjson", None):
+            records = _run_main(detect_boards, capsys, [_make_port("/dev/ttyUSB0", "Ünïcödé")])
+        assert records[0]["description"] == "Ünïcödé"
+
+    def test_stdlib_fallback_is_compact(self, detect_boards):
+        with patch.object(detect_boards, "orjson", None):
+            assert detect_boards.encode({"info": "no devices found"}) == b'{"info":"no devices found"}'
+
+    def test_constant_lines_match_encoder(self, detect_boards):
+        with patch.object(detect_boards, "orjson", None):
+            assert detect_boards.NO_DEVICES_LINE == detect_boards.encode({"info": "no devices found"})
+            assert detect_boards.PYSERIAL_ERROR_LINE == detect_boards.encode({"error": "pyserial not installed"})
+            assert detect_boards.EOM_LINE == detect_boards.encode({"eom": True})
+            assert detect_boards.UNCHANGED_LINE == detect_boards.encode({"unchanged": True})
+
+    def test_orjson_and_stdlib_encodings_agree(self, detect_boards):
+        pytest.importorskip("orjson")
+        record = {"path": "/dev/ttyUSB0", "vid": "2341", "serial_number": None}
+        with patch.object(detect_boards, "orjson", None):
+            fallback = detect_boards.encode(record)
+        assert json.loads(detect_boards.encode(record)) == json.loads(fallback)
+
 
 # ---------------------------------------------------------------------------
 # VID / PID hex formatting
 # ---------------------------------------------------------------------------
 
 class TestVidPidFormatting:
-    def test_vid_formatted_as_4_digit_uppercase_hex(self):
-        record = _run_main([_make_port("/dev/ttyUSB0", "desc", vid=0x2341)])[0]
+    def test_vid_formatted_as_4_digit_uppercase_hex(self, detect_boards, capsys):
+        record = _run_main(detect_boards, capsys, [_make_port("/dev/ttyUSB0", "desc", vid=0x2341)])[0]
         assert record["vid"] == "2341"
 
-    def test_pid_formatted_as_4_digit_uppercase_hex(self):
-        record = _run_main([_make_port("/dev/ttyUSB0", "desc", pid=0x0043)])[0]
+    def test_pid_formatted_as_4_digit_uppercase_hex(self, detect_boards, capsys):
+        record = _run_main(detect_boards, capsys, [_make_port("/dev/ttyUSB0", "desc", pid=0x0043)])[0]
         assert record["pid"] == "0043"
 
-    def test_small_vid_padded_to_4_digits(self):
-        record = _run_main([_make_port("/dev/ttyUSB0", "desc", vid=0x0001)])[0]
+    def test_small_vid_padded_to_4_digits(self, detect_boards, capsys):
+        record = _run_main(detect_boards, capsys, [_make_port("/dev/ttyUSB0", "desc", vid=0x0001)])[0]
         assert record["vid"] == "0001"
         assert len(record["vid"]) == 4
 
-    def test_large_vid_hex(self):
-        record = _run_main([_make_port("/dev/ttyUSB0", "desc", vid=0x10C4)])[0]
+    def test_large_vid_hex(self, detect_boards, capsys):
+        record = _run_main(detect_boards, capsys, [_make_port("/dev/ttyUSB0", "desc", vid=0x10C4)])[0]
         assert record["vid"] == "10C4"
 
-    def test_vid_none_is_null(self):
-        record = _run_main([_make_port("/dev/ttyUSB0", "desc", vid=None)])[0]
+    def test_vid_none_is_null(self, detect_boards, capsys):
+        record = _run_main(detect_boards, capsys, [_make_port("/dev/ttyUSB0", "desc", vid=None)])[0]
         assert record["vid"] is None
 
-    def test_pid_none_is_null(self):
-        record = _run_main([_make_port("/dev/ttyUSB0", "desc", pid=None)])[0]
+    def test_pid_none_is_null(self, detect_boards, capsys):
+        record = _run_main(detect_boards, capsys, [_make_port("/dev/ttyUSB0", "desc", pid=None)])[0]
         assert record["pid"] is None
 
-    def test_well_known_arduino_uno_vid_pid(self):
-        record = _run_main([_make_port("/dev/ttyACM0", "desc", vid=0x2341, pid=0x0043)])[0]
+    def test_vid_pid_each_read_once(self, detect_boards, capsys):
+        reads = []
+
+        class CountingPort:
+            device = "/dev/ttyACM0"
+            description = "desc"
+            manufacturer = None
+            serial_number = None
+
+            @property
+            def vid(self):
+                reads.append("vid")
+                return 0x2341
+
+            @property
+            def pid(self):
+                reads.append("pid")
+                return 0x0043
+
+        _run_main(detect_boards, capsys, [CountingPort()])
+        assert sorted(reads) == ["pid", "vid"]
+
+    def test_well_known_arduino_uno_vid_pid(self, detect_boards, capsys):
+        record = _run_main(detect_boards, capsys, [_make_port("/dev/ttyACM0", "desc", vid=0x2341, pid=0x0043)])[0]
         assert record["vid"] == "2341"
         assert record["pid"] == "0043"
 
@@ -147,24 +220,24 @@ class TestVidPidFormatting:
 # ---------------------------------------------------------------------------
 
 class TestNoDevices:
-    def test_no_ports_outputs_one_record(self):
-        records = _run_main([])
+    def test_no_ports_outputs_one_record(self, detect_boards, capsys):
+        records = _run_main(detect_boards, capsys, [])
         assert len(records) == 1
 
-    def test_no_ports_record_has_info_key(self):
-        records = _run_main([])
+    def test_no_ports_record_has_info_key(self, detect_boards, capsys):
+        records = _run_main(detect_boards, capsys, [])
         assert "info" in records[0]
 
-    def test_no_ports_info_message(self):
-        records = _run_main([])
+    def test_no_ports_info_message(self, detect_boards, capsys):
+        records = _run_main(detect_boards, capsys, [])
         assert records[0]["info"] == "no devices found"
 
-    def test_no_ports_record_has_no_error_key(self):
-        records = _run_main([])
+    def test_no_ports_record_has_no_error_key(self, detect_boards, capsys):
+        records = _run_main(detect_boards, capsys, [])
         assert "error" not in records[0]
 
-    def test_no_ports_record_has_no_path_key(self):
-        records = _run_main([])
+    def test_no_ports_record_has_no_path_key(self, detect_boards, capsys):
+        records = _run_main(detect_boards, capsys, [])
         assert "path" not in records[0]
 
 
@@ -173,100 +246,350 @@ class TestNoDevices:
 # ---------------------------------------------------------------------------
 
 class TestPortFilter:
-    def test_filter_returns_only_matching_port(self):
+    def test_filter_returns_only_matching_port(self, detect_boards, capsys):
         ports = [
             _make_port("/dev/ttyUSB0", "Device A"),
             _make_port("/dev/ttyACM0", "Device B"),
         ]
-        records = _run_main(ports, argv=["--port", "/dev/ttyUSB0"])
+        records = _run_main(detect_boards, capsys, ports, argv=["--port", "/dev/ttyUSB0"])
         assert len(records) == 1
         assert records[0]["path"] == "/dev/ttyUSB0"
 
-    def test_filter_no_match_emits_no_devices(self):
+    def test_filter_no_match_emits_no_devices(self, detect_boards, capsys):
         ports = [_make_port("/dev/ttyUSB0", "Device A")]
-        records = _run_main(ports, argv=["--port", "/dev/ttyACM99"])
+        records = _run_main(detect_boards, capsys, ports, argv=["--port", "/dev/ttyACM99"])
         assert "info" in records[0]
 
-    def test_filter_exact_device_match_only(self):
+    def test_filter_exact_device_match_only(self, detect_boards, capsys):
         ports = [
             _make_port("/dev/ttyUSB0", "Device A"),
             _make_port("/dev/ttyUSB1", "Device B"),
         ]
-        records = _run_main(ports, argv=["--port", "/dev/ttyUSB0"])
+        records = _run_main(detect_boards, capsys, ports, argv=["--port", "/dev/ttyUSB0"])
         assert len(records) == 1
         assert records[0]["path"] == "/dev/ttyUSB0"
 
-    def test_no_filter_returns_all_ports(self):
+    def test_no_filter_returns_all_ports(self, detect_boards, capsys):
         ports = [_make_port(f"/dev/ttyUSB{i}", f"Device {i}") for i in range(4)]
-        assert len(_run_main(ports)) == 4
+        assert len(_run_main(detect_boards, capsys, ports)) == 4
 
-    def test_filter_preserves_full_record_content(self):
+    def test_filter_preserves_full_record_content(self, detect_boards, capsys):
         ports = [
             _make_port("/dev/ttyUSB0", "Correct", manufacturer="Mfr", vid=0x1234, pid=0xABCD),
             _make_port("/dev/ttyUSB1", "Wrong"),
         ]
-        records = _run_main(ports, argv=["--port", "/dev/ttyUSB0"])
+        records = _run_main(detect_boards, capsys, ports, argv=["--port", "/dev/ttyUSB0"])
         assert records[0]["description"] == "Correct"
         assert records[0]["vid"] == "1234"
         assert records[0]["pid"] == "ABCD"
 
+    def test_filter_stops_enumerating_after_match(self, detect_boards, capsys):
+        def ports():
+            yield _make_port("/dev/ttyUSB0", "Device A")
+            yield _make_port("/dev/ttyUSB1", "Device B")
+            raise AssertionError("enumeration continued past the requested port")
+
+        records = _run_main(detect_boards, capsys, ports(), argv=["--port", "/dev/ttyUSB0"])
+        assert [r["path"] for r in records] == ["/dev/ttyUSB0"]
+
+    def test_missing_device_node_skips_enumeration(self, detect_boards, capsys, tmp_path):
+        mock_comports = MagicMock(return_value=[_make_port("/dev/ttyUSB0", "Device A")])
+        missing = str(tmp_path / "ttyUSB0")
+        with patch.object(detect_boards, "iter_comports", mock_comports), \
+                patch.object(detect_boards.os, "name", "posix"), \
+                patch.object(sys, "argv", ["detect_boards.py", "--no-cache", "--port", missing]):
+            detect_boards.main()
+        mock_comports.assert_not_called()
+        assert _read_records(capsys) == [{"info": "no devices found"}]
+
+    def test_device_exists_for_existing_node(self, detect_boards, capsys, tmp_path):
+        node = tmp_path / "ttyUSB0"
+        node.write_text("")
+        with patch.object(detect_boards.os, "name", "posix"):
+            assert detect_boards.device_exists(str(node)) is True
+
+    def test_device_exists_defers_on_windows(self, detect_boards, capsys):
+        with patch.object(detect_boards.os, "name", "nt"):
+            assert detect_boards.device_exists("COM3") is True
+
+
+# ---------------------------------------------------------------------------
+# Pseudo-port filtering (--all)
+# ---------------------------------------------------------------------------
+
+class TestPseudoPorts:
+    PORTS = [
+        _make_port("/dev/ttyS0", "n/a"),
+        _make_port("/dev/cu.Bluetooth-Incoming-Port", "n/a"),
+        _make_port("/dev/ttyACM0", "Arduino Mega", vid=0x2341, pid=0x0042),
+    ]
+
+    def test_pseudo_ports_skipped_by_default(self, detect_boards, capsys):
+        records = _run_main(detect_boards, capsys, self.PORTS)
+        assert [r["path"] for r in records] == ["/dev/ttyACM0"]
+
+    def test_all_flag_lists_pseudo_ports(self, detect_boards, capsys):
+        records = _run_main(detect_boards, capsys, self.PORTS, argv=["--all"])
+        assert len(records) == 3
+
+    def test_usb_adapter_on_ttys_is_kept(self, detect_boards, capsys):
+        ports = [_make_port("/dev/ttyS4", "USB serial", vid=0x1A86, pid=0x7523)]
+        records = _run_main(detect_boards, capsys, ports)
+        assert records[0]["path"] == "/dev/ttyS4"
+
+    def test_explicit_port_request_is_honoured(self, detect_boards, capsys):
+        records = _run_main(detect_boards, capsys, self.PORTS, argv=["--port", "/dev/ttyS0"])
+        assert records[0]["path"] == "/dev/ttyS0"
+
+    def test_only_pseudo_ports_reports_no_devices(self, detect_boards, capsys):
+        records = _run_main(detect_boards, capsys, self.PORTS[:2])
+        assert records == [{"info": "no devices found"}]
+
+
+# ---------------------------------------------------------------------------
+# Argument parsing
+# ---------------------------------------------------------------------------
+
+class TestParseArgs:
+    def test_value_options_and_flags(self, detect_boards, capsys):
+        args = detect_boards.parse_args(["--serve", "--port", "COM3", "--no-cache"])
+        assert args == {"--serve": True, "--port": "COM3", "--no-cache": True}
+
+    def test_value_option_without_value_is_ignored(self, detect_boards, capsys):
+        assert detect_boards.parse_args(["--port"]) == {}
+
+    def test_invalid_cache_ttl_falls_back_to_default(self, detect_boards, capsys):
+        records = _run_main(detect_boards, capsys, [_make_port("/dev/ttyUSB0", "desc")], argv=["--cache-ttl", "soon"])
+        assert records[0]["path"] == "/dev/ttyUSB0"
+
+
+# ---------------------------------------------------------------------------
+# Result cache (--no-cache / --cache-ttl)
+# ---------------------------------------------------------------------------
+
+class TestCache:
+    @pytest.fixture(autouse=True)
+    def _cache_path(self, tmp_path):
+        self.cache_path = str(tmp_path / "ports.json")
+
+    def _run(self, detect_boards, capsys, comports_return, argv=None):
+        """Like _run_main, but with caching enabled; returns (records, comports mock)."""
+        mock_comports = MagicMock(return_value=comports_return)
+        with patch.object(detect_boards, "CACHE_PATH", self.cache_path), \
+                patch.object(detect_boards, "iter_comports", mock_comports), \
+                patch.object(detect_boards, "device_exists", return_value=True), \
+                patch.object(sys, "argv", ["detect_boards.py"] + (argv or [])):
+            detect_boards.main()
+        return _read_records(capsys), mock_comports
+
+    def test_fresh_cache_skips_enumeration(self, detect_boards, capsys):
+        self._run(detect_boards, capsys, [_make_port("/dev/ttyUSB0", "Device A")])
+        records, mock_comports = self._run(detect_boards, capsys, [])
+        mock_comports.assert_not_called()
+        assert records[0]["path"] == "/dev/ttyUSB0"
+
+    def test_cache_file_is_written(self, detect_boards, capsys):
+        self._run(detect_boards, capsys, [_make_port("/dev/ttyUSB0", "Device A")])
+        with open(self.cache_path, encoding="utf-8") as f:
+            snapshot = json.load(f)
+        assert snapshot["platform"] == sys.platform
+        assert snapshot["records"][0]["path"] == "/dev/ttyUSB0"
+
+    def test_no_cache_flag_forces_enumeration(self, detect_boards, capsys):
+        self._run(detect_boards, capsys, [_make_port("/dev/ttyUSB0", "Device A")])
+        records, mock_comports = self._run(detect_boards, capsys, [], argv=["--no-cache"])
+        mock_comports.assert_called_once()
+        assert records[0] == {"info": "no devices found"}
+
+    def test_expired_cache_is_ignored(self, detect_boards, capsys):
+        self._run(detect_boards, capsys, [_make_port("/dev/ttyUSB0", "Device A")])
+        stale = os.stat(self.cache_path).st_mtime - 10
+        os.utime(self.cache_path, (stale, stale))
+        records, mock_comports = self._run(detect_boards, capsys, [_make_port("/dev/ttyACM0", "Device B")])
+        mock_comports.assert_called_once()
+        assert records[0]["path"] == "/dev/ttyACM0"
+
+    def test_future_mtime_is_not_fresh(self, detect_boards, capsys):
+        self._run(detect_boards, capsys, [_make_port("/dev/ttyUSB0", "Device A")])
+        os.utime(self.cache_path, (2e9, 2e9))
+        records, mock_comports = self._run(detect_boards, capsys, [_make_port("/dev/ttyACM0", "Device B")])
+        mock_comports.assert_called_once()
+        assert records[0]["path"] == "/dev/ttyACM0"
+
+    @pytest.mark.skipif(not hasattr(os, "getuid"), reason="POSIX file ownership")
+    def test_cache_owned_by_another_user_is_ignored(self, detect_boards, capsys):
+        self._run(detect_boards, capsys, [_make_port("/dev/ttyUSB0", "Device A")])
+        with patch.object(detect_boards.os, "getuid", return_value=os.getuid() + 1):
+            records, mock_comports = self._run(detect_boards, capsys, [_make_port("/dev/ttyACM0", "Device B")])
+        mock_comports.assert_called_once()
+        assert records[0]["path"] == "/dev/ttyACM0"
+
+    def test_cache_write_leaves_no_temp_files(self, detect_boards, capsys):
+        self._run(detect_boards, capsys, [_make_port("/dev/ttyUSB0", "Device A")])
+        assert os.listdir(os.path.dirname(self.cache_path)) == [os.path.basename(self.cache_path)]
+
+    def test_zero_ttl_disables_cache(self, detect_boards, capsys):
+        self._run(detect_boards, capsys, [_make_port("/dev/ttyUSB0", "Device A")], argv=["--cache-ttl", "0"])
+        assert not os.path.exists(self.cache_path)
+
+    def test_cache_from_other_platform_is_ignored(self, detect_boards, capsys):
+        with open(self.cache_path, "w", encoding="utf-8") as f:
+            json.dump({"platform": "other", "records": [{"path": "COM3"}]}, f)
+        records, mock_comports = self._run(detect_boards, capsys, [])
+        mock_comports.assert_called_once()
+        assert records[0] == {"info": "no devices found"}
+
+    @pytest.mark.parametrize("contents", [
+        "[1, 2]",
+        "null",
+        json.dumps({"platform": sys.platform, "records": [{"description": "no path"}]}),
+    ])
+    def test_malformed_cache_is_ignored(self, detect_boards, capsys, contents):
+        with open(self.cache_path, "w", encoding="utf-8") as f:
+            f.write(contents)
+        records, mock_comports = self._run(
+            detect_boards, capsys, [_make_port("/dev/ttyUSB0", "Device A")], argv=["--port", "/dev/ttyUSB0"]
+        )
+        mock_comports.assert_called_once()
+        assert records[0]["path"] == "/dev/ttyUSB0"
+
+    def test_all_flag_does_not_reuse_filtered_snapshot(self, detect_boards, capsys):
+        ports = [_make_port("/dev/ttyS0", "n/a"), _make_port("/dev/ttyACM0", "Arduino", vid=0x2341)]
+        self._run(detect_boards, capsys, ports)
+        records, mock_comports = self._run(detect_boards, capsys, ports, argv=["--all"])
+        mock_comports.assert_called_once()
+        assert len(records) == 2
+
+    def test_filter_applies_to_cached_records(self, detect_boards, capsys):
+        ports = [_make_port("/dev/ttyUSB0", "Device A"), _make_port("/dev/ttyACM0", "Device B")]
+        self._run(detect_boards, capsys, ports)
+        records, _ = self._run(detect_boards, capsys, [], argv=["--port", "/dev/ttyACM0"])
+        assert [r["path"] for r in records] == ["/dev/ttyACM0"]
+
+    def test_explicit_pseudo_port_missing_from_cache_is_rescanned(self, detect_boards, capsys):
+        ports = [_make_port("/dev/ttyS0", "n/a"), _make_port("/dev/ttyACM0", "Arduino", vid=0x2341)]
+        self._run(detect_boards, capsys, ports)
+        records, mock_comports = self._run(detect_boards, capsys, ports, argv=["--port", "/dev/ttyS0"])
+        mock_comports.assert_called_once()
+        assert [r["path"] for r in records] == ["/dev/ttyS0"]
+
+
+# ---------------------------------------------------------------------------
+# Long-lived mode (--serve)
+# ---------------------------------------------------------------------------
+
+class TestServe:
+    def _serve(self, detect_boards, capsys, comports_return, stdin_text):
+        """Run main() with --serve, feeding `stdin_text`; returns (records, comports mock)."""
+        mock_comports = MagicMock(return_value=comports_return)
+        with patch.object(detect_boards, "iter_comports", mock_comports), \
+                patch.object(detect_boards, "device_exists", return_value=True), \
+                patch.object(sys, "argv", ["detect_boards.py", "--serve", "--no-cache"]), \
+                patch("sys.stdin", io.StringIO(stdin_text)):
+            detect_boards.main()
+        return _read_records(capsys), mock_comports
+
+    def test_one_batch_per_request_line(self, detect_boards, capsys):
+        records, mock_comports = self._serve(detect_boards, capsys, [_make_port("/dev/ttyUSB0", "A")], "\n\n")
+        assert mock_comports.call_count == 2
+        assert records.count({"eom": True}) == 2
+
+    def test_identical_batch_reported_as_unchanged(self, detect_boards, capsys):
+        records, _ = self._serve(detect_boards, capsys, [_make_port("/dev/ttyUSB0", "A")], "\n\n")
+        assert records[0]["path"] == "/dev/ttyUSB0"
+        assert records[2:] == [{"unchanged": True}, {"eom": True}]
+
+    def test_changed_batch_sent_in_full(self, detect_boards, capsys):
+        mock_comports = MagicMock(side_effect=[
+            [_make_port("/dev/ttyUSB0", "A")],
+            [_make_port("/dev/ttyUSB0", "A"), _make_port("/dev/ttyACM0", "B")],
+        ])
+        with patch.object(detect_boards, "iter_comports", mock_comports), \
+                patch.object(detect_boards, "device_exists", return_value=True), \
+                patch.object(sys, "argv", ["detect_boards.py", "--serve", "--no-cache"]), \
+                patch("sys.stdin", io.StringIO("\n\n")):
+            detect_boards.main()
+        records = _read_records(capsys)
+        assert {"unchanged": True} not in records
+        assert [r.get("path") for r in records[2:]] == ["/dev/ttyUSB0", "/dev/ttyACM0", None]
+
+    def test_batch_ends_with_eom(self, detect_boards, capsys):
+        records, _ = self._serve(detect_boards, capsys, [_make_port("/dev/ttyUSB0", "A")], "\n")
+        assert records[0]["path"] == "/dev/ttyUSB0"
+        assert records[-1] == {"eom": True}
+
+    def test_json_frame_filters_port(self, detect_boards, capsys):
+        ports = [_make_port("/dev/ttyUSB0", "A"), _make_port("/dev/ttyACM0", "B")]
+        records, _ = self._serve(detect_boards, capsys, ports, '{"port": "/dev/ttyACM0"}\n')
+        assert len(records) == 2
+        assert records[0]["path"] == "/dev/ttyACM0"
+
+    def test_json_string_filters_port(self, detect_boards, capsys):
+        ports = [_make_port("/dev/ttyUSB0", "A"), _make_port("/dev/ttyACM0", "B")]
+        records, _ = self._serve(detect_boards, capsys, ports, '"/dev/ttyACM0"\n')
+        assert len(records) == 2
+        assert records[0]["path"] == "/dev/ttyACM0"
+
+    @pytest.mark.parametrize("frame", ['{"port": ["/dev/ttyACM0"]}', '{"port": 5}', '{"port": null}', "[1]"])
+    def test_non_string_port_lists_all_ports(self, detect_boards, capsys, frame):
+        ports = [_make_port("/dev/ttyUSB0", "A"), _make_port("/dev/ttyACM0", "B")]
+        records, _ = self._serve(detect_boards, capsys, ports, frame + "\n")
+        assert [r.get("path") for r in records] == ["/dev/ttyUSB0", "/dev/ttyACM0", None]
+
+    def test_bare_path_filters_port(self, detect_boards, capsys):
+        ports = [_make_port("/dev/ttyUSB0", "A"), _make_port("/dev/ttyACM0", "B")]
+        records, _ = self._serve(detect_boards, capsys, ports, "/dev/ttyUSB0\n")
+        assert records[0]["path"] == "/dev/ttyUSB0"
+        assert len(records) == 2
+
+    def test_no_devices_batch_still_terminated(self, detect_boards, capsys):
+        records, _ = self._serve(detect_boards, capsys, [], "\n")
+        assert records == [{"info": "no devices found"}, {"eom": True}]
+
+    def test_empty_stdin_emits_nothing(self, detect_boards, capsys):
+        records, mock_comports = self._serve(detect_boards, capsys, [], "")
+        assert records == []
+        mock_comports.assert_not_called()
+
 
 # ---------------------------------------------------------------------------
 # pyserial not installed
 # ---------------------------------------------------------------------------
 
+def _block_pyserial_import():
+    """Patch builtins.__import__ so that any import of serial.* fails."""
+    real_import = builtins.__import__
+
+    def blocking_import(name, *args, **kwargs):
+        if name == "serial" or name.startswith("serial."):
+            raise ImportError(f"No module named '{name}'")
+        return real_import(name, *args, **kwargs)
+
+    return patch("builtins.__import__", side_effect=blocking_import)
+
+
 class TestPyserialMissing:
-    def test_missing_pyserial_exits_with_code_1(self):
-        """Module-level ImportError causes print+exit(1)."""
-        real_import = builtins.__import__
-
-        serial_cache = {k: v for k, v in list(sys.modules.items())
-                        if k == "serial" or k.startswith("serial.")}
-        for key in serial_cache:
-            del sys.modules[key]
-
-        def blocking_import(name, *args, **kwargs):
-            if name == "serial.tools.list_ports" or name == "serial":
-                raise ImportError(f"No module named '{name}'")
-            return real_import(name, *args, **kwargs)
-
-        captured = io.StringIO()
-        with patch("builtins.__import__", side_effect=blocking_import):
+    def _run_without_pyserial(self, detect_boards):
+        with _block_pyserial_import(), patch.object(sys, "argv", ["detect_boards.py", "--no-cache"]):
             with pytest.raises(SystemExit) as exc_info:
-                with patch("sys.stdout", captured):
-                    spec = importlib.util.spec_from_file_location(
-                        "detect_boards_err", DETECT_BOARDS_PATH
-                    )
-                    mod = importlib.util.module_from_spec(spec)
-                    spec.loader.exec_module(mod)
-
-        assert exc_info.value.code == 1
-        sys.modules.update(serial_cache)
-
-    def test_missing_pyserial_outputs_error_json(self):
-        """Module-level ImportError causes {"error": "pyserial not installed"} output."""
-        real_import = builtins.__import__
-        serial_cache = {k: v for k, v in list(sys.modules.items())
-                        if k == "serial" or k.startswith("serial.")}
-        for key in serial_cache:
-            del sys.modules[key]
-
-        def blocking_import(name, *args, **kwargs):
-            if name == "serial.tools.list_ports" or name == "serial":
-                raise ImportError(f"No module named '{name}'")
-            return real_import(name, *args, **kwargs)
-
-        captured = io.StringIO()
-        with patch("builtins.__import__", side_effect=blocking_import):
-            with pytest.raises(SystemExit):
-                with patch("sys.stdout", captured):
-                    spec = importlib.util.spec_from_file_location(
-                        "detect_boards_err2", DETECT_BOARDS_PATH
-                    )
-                    mod = importlib.util.module_from_spec(spec)
-                    spec.loader.exec_module(mod)
-
-        output = json.loads(captured.getvalue().strip())
+                detect_boards.main()
+        return exc_info.value
+
+    def test_missing_pyserial_exits_with_code_1(self, detect_boards):
+        """ImportError on first use of pyserial causes print+exit(1)."""
+        assert self._run_without_pyserial(detect_boards).code == 1
+
+    def test_missing_pyserial_outputs_error_json(self, detect_boards, capsys):
+        """ImportError on first use of pyserial causes {"error": "pyserial not installed"} output."""
+        self._run_without_pyserial(detect_boards)
+        output = json.loads(capsys.readouterr().out.strip())
         assert "error" in output
         assert "pyserial" in output["error"].lower()
-        sys.modules.update(serial_cache)
+
+    def test_module_imports_without_pyserial(self):
+        """pyserial is only imported when ports are enumerated."""
+        with _block_pyserial_import():
+            spec = importlib.util.spec_from_file_location("detect_boards_lazy", DETECT_BOARDS_PATH)
+            mod = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(mod)
+        assert callable(mod.main)